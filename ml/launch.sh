@@ -0,0 +1,18 @@
+#!/usr/bin/env sh
+# Production launch for the ML inference service (run from the repo root).
+# Each worker is its own process, so model/lookup caches are per worker.
+set -e
+
+# nproc is GNU coreutils (Linux); macOS has getconf/sysctl instead
+if [ -z "${WEB_CONCURRENCY:-}" ]; then
+  WEB_CONCURRENCY=$(nproc 2>/dev/null || getconf _NPROCESSORS_ONLN 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null || echo 1)
+fi
+
+exec python -m uvicorn ml.serve:app \
+  --host "${HOST:-0.0.0.0}" \
+  --port "${PORT:-8000}" \
+  --loop uvloop \
+  --http httptools \
+  --workers "$WEB_CONCURRENCY" \
+  --limit-concurrency 1000 \
+  --timeout-keep-alive 30
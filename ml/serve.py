@@ -1,21 +1,71 @@
 from __future__ import annotations
 
-import glob
+import asyncio
+import functools
 import json
+import math
 import os
+import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
+import httpx
+import bottleneck as bn
 import joblib
+import numpy as np
+import orjson
 import pandas as pd
-import requests
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from openai import OpenAI
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from openai import AsyncOpenAI
 
 PLATFORM_BASE_URL = os.environ.get("VIKLYST_PLATFORM_URL", "http://localhost:8080")
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+# Platform serializes LocalDate as ISO "YYYY-MM-DD"
+DAY_FORMAT = "%Y-%m-%d"
+# Numeric fields of the platform's BarDailyResponse (besides "day")
+BAR_COLUMNS = ("open", "high", "low", "close", "volume")
+# How long a resolved "latest model" path is reused before re-scanning MODELS_DIR
+LATEST_MODEL_TTL_SECONDS = float(os.environ.get("VIKLYST_LATEST_MODEL_TTL", "30"))
+
+# Short-lived response/data caches. Everything runs on the event loop thread,
+# so no locking is needed.
+# (symbol, from, to, model_path) -> PredictResponse
+_PRED_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=60)
+# (symbol, from, to, tail) -> bars DataFrame (treated as read-only)
+_BARS_CACHE: TTLCache = TTLCache(maxsize=512, ttl=300)
+
+# Shared keep-alive client for calls to the platform (opened on startup)
+CLIENT: httpx.AsyncClient | None = None
+# OpenAI client, created once on startup; None when no API key is configured
+OPENAI_CLIENT: AsyncOpenAI | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global CLIENT, OPENAI_CLIENT
+    OPENAI_CLIENT = AsyncOpenAI() if os.environ.get("OPENAI_API_KEY") else None
+    CLIENT = httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            retries=2,
+        ),
+        timeout=20.0,
+    )
+    try:
+        yield
+    finally:
+        await CLIENT.aclose()
+        if OPENAI_CLIENT is not None:
+            await OPENAI_CLIENT.close()
+
 
-app = FastAPI(title="Viklyst ML Inference Server")
+app = FastAPI(title="Viklyst ML Inference Server", lifespan=lifespan)
 
 # --- add DTOs ---
 class ExplainRequest(BaseModel):
@@ -31,27 +81,45 @@ class ExplainResponse(BaseModel):
     threshold: float
     explanation: str
 
-def fetch_json(url: str, params: dict | None = None):
-    r = requests.get(url, params=params, timeout=20)
+async def fetch_json(url: str, params: dict | None = None):
+    r = await CLIENT.get(url, params=params, timeout=20)
     r.raise_for_status()
-    return r.json()
+    return orjson.loads(r.content)
 
-def get_openai_client() -> OpenAI | None:
-    # If key missing, return None and we’ll do a fallback response
-    if not os.environ.get("OPENAI_API_KEY"):
-        return None
-    return OpenAI()
+def get_openai_client() -> AsyncOpenAI | None:
+    # If key missing, this is None and we’ll do a fallback response
+    return OPENAI_CLIENT
+
+def sse_event(text: str) -> str:
+    # multi-line payloads need one "data:" line per line
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+async def stream_explanation(client: AsyncOpenAI, prompt: str):
+    async with client.responses.stream(model="gpt-4o-mini", input=prompt) as events:
+        async for event in events:
+            if event.type == "response.output_text.delta":
+                yield sse_event(event.delta)
+
+async def stream_text(text: str):
+    yield sse_event(text)
 
 @app.post("/explain", response_model=ExplainResponse)
-def explain(req: ExplainRequest):
+async def explain(req: ExplainRequest, stream: bool = False):
+    """
+    Default: JSON ExplainResponse once the full explanation is ready.
+    ?stream=true: text/event-stream of explanation deltas as they are generated.
+    """
     sym = req.symbol.upper()
 
     # 1) pull benchmark + ML curve summaries from your platform
     buyhold_url = f"{PLATFORM_BASE_URL}/api/backtests/baseline/buy-and-hold"
     mlcurve_url = f"{PLATFORM_BASE_URL}/api/backtests/ml/curve"
 
-    buyhold = fetch_json(buyhold_url, params={"symbol": sym, "from": req.from_date, "to": req.to_date})
-    mlcurve = fetch_json(mlcurve_url, params={"symbol": sym, "from": req.from_date, "to": req.to_date, "threshold": req.threshold})
+    # both calls are independent, so overlap them
+    buyhold, mlcurve = await asyncio.gather(
+        fetch_json(buyhold_url, params={"symbol": sym, "from": req.from_date, "to": req.to_date}),
+        fetch_json(mlcurve_url, params={"symbol": sym, "from": req.from_date, "to": req.to_date, "threshold": req.threshold}),
+    )
 
     buyhold_sum = buyhold  # this endpoint returns summary directly
     ml_sum = mlcurve.get("summary", {})
@@ -85,6 +153,8 @@ def explain(req: ExplainRequest):
             f"drawdown={facts['ml_strategy']['maxDrawdownPct']}%.\n"
             f"This is a demo explanation. Set OPENAI_API_KEY to get real LLM output."
         )
+        if stream:
+            return StreamingResponse(stream_text(explanation.strip()), media_type="text/event-stream")
     else:
         prompt = f"""
 You are an assistant explaining backtest results to a beginner.
@@ -92,20 +162,24 @@ Explain in simple terms, avoid hype, and include 3 bullet takeaways + 2 cautions
 Do NOT give financial advice.
 
 FACTS (JSON):
-{json.dumps(facts, indent=2)}
+{orjson.dumps(facts, option=orjson.OPT_INDENT_2).decode()}
 """
-        resp = client.responses.create(
+        if stream:
+            return StreamingResponse(stream_explanation(client, prompt), media_type="text/event-stream")
+
+        resp = await client.responses.create(
             model="gpt-4o-mini",
             input=prompt,
         )
         explanation = resp.output_text
 
-    return ExplainResponse(
+    # fields are built from already-validated values, so skip re-validating them
+    return ExplainResponse.model_construct(
         symbol=sym,
         from_date=req.from_date,
         to_date=req.to_date,
         threshold=req.threshold,
-        explanation=explanation.strip()
+        explanation=explanation.strip(),
     )
 
 # -------------------------
@@ -130,12 +204,40 @@ class PredictResponse(BaseModel):
 # -------------------------
 # Helpers
 # -------------------------
+# symbol -> (resolved_at, model_path)
+_latest_model_cache: dict[str, tuple[float, str]] = {}
+
+
 def latest_model_for_symbol(symbol: str) -> str:
-    pattern = os.path.join(MODELS_DIR, f"{symbol.upper()}_*_logreg.joblib")
-    candidates = sorted(glob.glob(pattern))
-    if not candidates:
+    sym = symbol.upper()
+    now = time.monotonic()
+    hit = _latest_model_cache.get(sym)
+    if hit is not None and now - hit[0] < LATEST_MODEL_TTL_SECONDS:
+        return hit[1]
+
+    # single directory pass, keeping the max name (latest by filename timestamp);
+    # equivalent to the old sorted(glob("<SYM>_*_logreg.joblib"))[-1]
+    prefix, suffix = f"{sym}_", "_logreg.joblib"
+    best = None
+    try:
+        with os.scandir(MODELS_DIR) as entries:
+            for entry in entries:
+                name = entry.name
+                if (
+                    len(name) >= len(prefix) + len(suffix)
+                    and name.startswith(prefix)
+                    and name.endswith(suffix)
+                    and (best is None or name > best)
+                ):
+                    best = name
+    except FileNotFoundError:
+        pass
+    if best is None:
+        pattern = os.path.join(MODELS_DIR, f"{sym}_*{suffix}")
         raise FileNotFoundError(f"No model found for {symbol}. Expected something like: {pattern}")
-    return candidates[-1]  # latest by filename timestamp
+    path = os.path.join(MODELS_DIR, best)
+    _latest_model_cache[sym] = (now, path)
+    return path
 
 
 def load_meta_for_model(model_path: str) -> dict:
@@ -147,28 +249,106 @@ def load_meta_for_model(model_path: str) -> dict:
         return json.load(f)
 
 
-def fetch_bars(symbol: str, from_date: str, to_date: str) -> pd.DataFrame:
+def linear_params(model) -> tuple[np.ndarray, float] | None:
+    """
+    Fold Pipeline(StandardScaler, LogisticRegression) into a single (w, b) so that
+    prob_up = sigmoid(w @ x + b) on raw features. Returns None for any other model
+    shape or scaler configuration; those go through predict_proba instead.
+    """
+    if not isinstance(model, Pipeline) or len(model.steps) != 2:
+        return None
+    scaler = model.named_steps.get("scaler")
+    clf = model.named_steps.get("clf")
+    # the fold assumes (x - mean_) / scale_, i.e. a scaler with both steps enabled
+    if not (
+        isinstance(scaler, StandardScaler)
+        and scaler.with_mean
+        and scaler.with_std
+        and isinstance(clf, LogisticRegression)
+        and len(clf.classes_) == 2
+    ):
+        return None
+
+    coef = np.asarray(clf.coef_[0], dtype=np.float64)
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    w = coef / scale
+    b = float(clf.intercept_[0]) - float((coef * mean / scale).sum())
+    if not (np.isfinite(w).all() and math.isfinite(b)):
+        return None
+    return w, b
+
+
+def sigmoid(z: float) -> float:
+    # numerically stable for large |z|
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_model_cached(model_path: str, mtime: float):
+    # mtime is part of the key so a rewritten file is picked up again
+    model = joblib.load(model_path)
+    meta = load_meta_for_model(model_path)
+    # feature order the model was trained on, frozen for reuse across requests
+    feature_cols = tuple(meta.get("feature_columns") or ())
+    return model, feature_cols, linear_params(model)
+
+
+async def fetch_bars(symbol: str, from_date: str, to_date: str, tail: int | None = None) -> pd.DataFrame:
+    """
+    Daily bars in [from_date, to_date]. With tail=N only the last N bars of that
+    range are requested from the platform (still oldest -> newest).
+    """
+    key = (symbol.upper(), from_date, to_date, tail)
+    cached = _BARS_CACHE.get(key)
+    if cached is not None:
+        return cached
+
     url = f"{PLATFORM_BASE_URL}/api/instruments/{symbol.upper()}/bars/daily"
-    r = requests.get(url, params={"from": from_date, "to": to_date}, timeout=15)
+    params = {"from": from_date, "to": to_date}
+    if tail is not None:
+        params["tail"] = tail
+    r = await CLIENT.get(url, params=params, timeout=15)
     if r.status_code != 200:
         raise HTTPException(status_code=400, detail=f"Failed to fetch bars: {r.status_code} {r.text}")
 
-    data = r.json()
+    data = orjson.loads(r.content)
     if not data:
         raise HTTPException(status_code=400, detail="No bars returned (empty dataset)")
 
     # Expect at least: day + close
-    df = pd.DataFrame(data)
-    if "close" not in df.columns:
-        raise HTTPException(status_code=400, detail=f"Bars response missing 'close'. Got columns: {list(df.columns)}")
-
-    # Normalize/parse day column
-    if "day" in df.columns:
-        df["day"] = pd.to_datetime(df["day"])
-        df = df.sort_values("day").reset_index(drop=True)
+    if "close" not in data[0]:
+        raise HTTPException(status_code=400, detail=f"Bars response missing 'close'. Got columns: {list(data[0])}")
+
+    # Build typed columns directly instead of letting pandas infer from dicts
+    # (a null volume becomes NaN)
+    df = pd.DataFrame({
+        c: np.array([row.get(c) for row in data], dtype=np.float64) for c in BAR_COLUMNS
+    })
+    df.insert(0, "day", pd.to_datetime([row["day"] for row in data], format=DAY_FORMAT, cache=True))
+    # bars come back in day order; only sort if they don't
+    if not df["day"].is_monotonic_increasing:
+        df = df.sort_values("day", kind="stable").reset_index(drop=True)
+
+    _BARS_CACHE[key] = df
     return df
 
 
+def _move(fn, values: np.ndarray, window: int, **kwargs) -> np.ndarray:
+    # bottleneck rejects windows longer than the series; pandas gives all-NaN
+    if len(values) < window:
+        return np.full_like(values, np.nan)
+    # bottleneck skips NaN, but an inf poisons its running sums for the rest of
+    # the series; as NaN it only blanks the windows holding it (like pandas)
+    finite = np.isfinite(values)
+    if not finite.all():
+        values = np.where(finite, values, np.nan)
+    return fn(values, window, **kwargs)
+
+
 def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     IMPORTANT:
@@ -177,33 +357,66 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
       (A) copy that feature function here, or
       (B) import it from train.py and reuse it.
     """
-    out = df.copy()
-
-    out["day"] = pd.to_datetime(out["day"])
-    out = out.sort_values("day").reset_index(drop=True)
+    days = pd.to_datetime(df["day"], format=DAY_FORMAT, cache=True)
+    in_order = days.is_monotonic_increasing
+    days = days.to_numpy()
 
     # Same features as train.py
-    out["ret_1d"] = out["close"].pct_change()
+    close = df["close"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
+    if not in_order:
+        order = np.argsort(days, kind="stable")
+        days, close, volume = days[order], close[order], volume[order]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret_1d = np.full_like(close, np.nan)
+        ret_1d[1:] = close[1:] / close[:-1] - 1.0
+
+        ma_5 = _move(bn.move_mean, close, 5)
+        ma_10 = _move(bn.move_mean, close, 10)
+
+        volchg_1d = np.full_like(volume, np.nan)
+        volchg_1d[1:] = volume[1:] / volume[:-1] - 1.0
+
+    # Build the output directly; the caller's frame is never copied or mutated
+    out = pd.DataFrame({
+        "day": days,
+        "close": close,
+        "volume": volume,
+        "ret_1d": ret_1d,
+        "ma_5": ma_5,
+        "ma_10": ma_10,
+        "close_over_ma5": close / ma_5 - 1.0,
+        "close_over_ma10": close / ma_10 - 1.0,
+        "vol_5": _move(bn.move_std, ret_1d, 5, ddof=1),
+        "vol_10": _move(bn.move_std, ret_1d, 10, ddof=1),
+        "volchg_1d": volchg_1d,
+    })
 
-    out["ma_5"] = out["close"].rolling(5).mean()
-    out["ma_10"] = out["close"].rolling(10).mean()
+    # Drop rows where rolling windows aren't ready
+    out = out.dropna().reset_index(drop=True)
+    return out
 
-    out["close_over_ma5"] = out["close"] / out["ma_5"] - 1.0
-    out["close_over_ma10"] = out["close"] / out["ma_10"] - 1.0
 
-    out["vol_5"] = out["ret_1d"].rolling(5).std()
-    out["vol_10"] = out["ret_1d"].rolling(10).std()
+# Bars needed for the last row to be complete: vol_10 is a 10-day std of
+# 1-day returns, and the first return needs one extra close.
+FEATURE_WARMUP_BARS = 11
 
-    out["volchg_1d"] = out["volume"].pct_change()
 
-    # Drop rows where rolling windows aren't ready
-    out = out.dropna().reset_index(drop=True)
-    return out
+def engineer_last_row(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Same as engineer_features(), but only for the most recent bar.
+    Rolling work is done over the last FEATURE_WARMUP_BARS bars instead of the full range.
+    """
+    if "day" in df.columns and not df["day"].is_monotonic_increasing:
+        df = df.sort_values("day")
+    return engineer_features(df.tail(FEATURE_WARMUP_BARS))
 
 
-def pick_latest_row_features(df_feat: pd.DataFrame, feature_cols: list[str]) -> tuple[str, list[float]]:
-    missing = [c for c in feature_cols if c not in df_feat.columns]
-    if missing:
+def pick_latest_row_features(df_feat: pd.DataFrame, feature_cols: tuple[str, ...]) -> tuple[str, np.ndarray]:
+    col_idx = df_feat.columns.get_indexer(feature_cols)
+    if (col_idx < 0).any():
+        missing = [c for c, i in zip(feature_cols, col_idx) if i < 0]
         raise HTTPException(
             status_code=500,
             detail=(
@@ -213,9 +426,9 @@ def pick_latest_row_features(df_feat: pd.DataFrame, feature_cols: list[str]) ->
             ),
         )
 
-    last = df_feat.iloc[-1]
-    as_of = str(last["day"].date()) if "day" in df_feat.columns else "latest"
-    x = [float(last[c]) for c in feature_cols]
+    as_of = str(df_feat["day"].iat[-1].date()) if "day" in df_feat.columns else "latest"
+    # one positional gather of the last row, in the model's feature order
+    x = df_feat.iloc[-1:, col_idx].to_numpy(dtype=np.float64)[0]
     return as_of, x
 
 
@@ -234,40 +447,67 @@ def health():
 
 
 @app.post("/predict", response_model=PredictResponse)
-def predict(req: PredictRequest):
+async def predict(req: PredictRequest):
     symbol = req.symbol.upper()
 
     model_path = req.model_path or latest_model_for_symbol(symbol)
+    cache_key = (symbol, req.from_date, req.to_date, model_path)
+    cached = _PRED_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        model = joblib.load(model_path)
-        meta = load_meta_for_model(model_path)
+        model, feature_cols, linear = _load_model_cached(model_path, os.path.getmtime(model_path))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load model/meta: {e}")
 
     # meta should contain the columns used during training
-    feature_cols = meta.get("feature_columns")
     if not feature_cols:
         raise HTTPException(
             status_code=500,
             detail="Meta JSON missing 'feature_columns'. Update train.py to store feature_columns in meta.",
         )
 
-    df = fetch_bars(symbol, req.from_date, req.to_date)
-    df_feat = engineer_features(df)
+    # only the trailing window feeds the last row's features
+    df = await fetch_bars(symbol, req.from_date, req.to_date, tail=FEATURE_WARMUP_BARS)
+    df_feat = engineer_last_row(df)
+
+    if len(df_feat) < 1:
+        # Missing data (e.g. a null volume) near the end leaves no complete row in
+        # the trailing window; the most recent complete row may be further back.
+        # A row's features only depend on the FEATURE_WARMUP_BARS bars ending at
+        # it, so the full range yields the same last row as before this shortcut
+        # (as_of reports its day, which can be earlier than to_date).
+        df = await fetch_bars(symbol, req.from_date, req.to_date)
+        df_feat = engineer_features(df)
 
     if len(df_feat) < 1:
         raise HTTPException(status_code=400, detail="Not enough bars after feature engineering (too short range).")
 
     as_of, x = pick_latest_row_features(df_feat, feature_cols)
 
+    # e.g. a zero volume followed by a non-zero one makes volchg_1d infinite
+    if not np.isfinite(x).all():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Non-finite features for {as_of} (check close/volume data): {dict(zip(feature_cols, x.tolist()))}",
+        )
+
     # Predict probability of class 1
-    prob_up = float(model.predict_proba([x])[0][1])
+    if linear is not None:
+        w, b = linear
+        prob_up = sigmoid(float(w @ x) + b)
+    else:
+        prob_up = float(model.predict_proba(x.reshape(1, -1))[0][1])
     predicted = 1 if prob_up >= 0.5 else 0
 
-    return PredictResponse(
+    # all fields already have the declared types, so skip re-validating them
+    resp = PredictResponse.model_construct(
         symbol=symbol,
         model_file=os.path.basename(model_path),
         as_of=as_of,
         prob_up=round(prob_up, 6),
         predicted=predicted,
     )
+    _PRED_CACHE[cache_key] = resp
+    return resp
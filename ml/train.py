@@ -5,13 +5,35 @@ from datetime import datetime
 
 import requests
 import numpy as np
+import orjson
 import pandas as pd
+from numba import njit
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+try:
+    import lz4  # noqa: F401  (enables joblib's lz4 compressor)
+    MODEL_COMPRESS = ("lz4", 3)
+except ImportError:
+    MODEL_COMPRESS = 3  # zlib
+
+
+# Shared keep-alive session for calls to the platform API
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.1),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
 
 
 def fetch_daily_bars(base_url: str, symbol: str, start: str, end: str) -> pd.DataFrame:
@@ -20,48 +42,166 @@ def fetch_daily_bars(base_url: str, symbol: str, start: str, end: str) -> pd.Dat
     GET /api/instruments/{symbol}/bars/daily?from=YYYY-MM-DD&to=YYYY-MM-DD
     """
     url = f"{base_url.rstrip('/')}/api/instruments/{symbol}/bars/daily"
-    r = requests.get(url, params={"from": start, "to": end}, timeout=30)
+    r = SESSION.get(url, params={"from": start, "to": end}, timeout=30)
     r.raise_for_status()
-    data = r.json()
+    data = orjson.loads(r.content)
 
     if not data:
         raise ValueError("No data returned from API.")
 
-    df = pd.DataFrame(data)
-
-    # Expecting: day, open, high, low, close, volume
-    df["day"] = pd.to_datetime(df["day"])
-    df = df.sort_values("day").reset_index(drop=True)
+    # Expecting: day, open, high, low, close, volume.
+    # Build typed columns directly instead of letting pandas infer from dicts.
+    df = pd.DataFrame({
+        c: np.array([row.get(c) for row in data], dtype=np.float64)
+        for c in ("open", "high", "low", "close", "volume")
+    })
+    df.insert(0, "day", pd.to_datetime([row["day"] for row in data], format="%Y-%m-%d", cache=True))
+    # the API already returns bars in day order; only sort if it doesn't
+    if not df["day"].is_monotonic_increasing:
+        df = df.sort_values("day", kind="stable").reset_index(drop=True)
     return df
 
 
-def build_features(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Create ML-friendly features from OHLCV.
-    Also create the target label: up tomorrow (1) / not up (0)
-    """
-    out = df.copy()
+@njit(cache=True)
+def _welford_add(x, count, mean, m2):
+    count += 1
+    d = x - mean
+    mean += d / count
+    m2 += d * (x - mean)
+    return count, mean, m2
 
-    # Basic returns
-    out["ret_1d"] = out["close"].pct_change()
 
-    # Moving averages (features)
-    out["ma_5"] = out["close"].rolling(5).mean()
-    out["ma_10"] = out["close"].rolling(10).mean()
+@njit(cache=True)
+def _welford_remove(x, count, mean, m2):
+    count -= 1
+    if count == 0:
+        return 0, 0.0, 0.0
+    d = x - mean
+    mean -= d / count
+    m2 -= d * (x - mean)
+    return count, mean, m2
 
-    # Price vs MA (normalized features)
-    out["close_over_ma5"] = out["close"] / out["ma_5"] - 1.0
-    out["close_over_ma10"] = out["close"] / out["ma_10"] - 1.0
 
-    # Volatility (std of returns)
-    out["vol_5"] = out["ret_1d"].rolling(5).std()
-    out["vol_10"] = out["ret_1d"].rolling(10).std()
+@njit(cache=True, error_model="numpy")
+def _features(close, volume):
+    """
+    One pass over close/volume computing the rolling features and target.
+    Means use running sums; return std uses a sliding Welford update.
+    Non-finite inputs are kept out of the accumulators and counted instead, so a
+    window holding one yields NaN (like pandas) and later windows recover.
+    Warmup slots are left as NaN.
+    """
+    n = close.shape[0]
+    ret_1d = np.full(n, np.nan)
+    ma_5 = np.full(n, np.nan)
+    ma_10 = np.full(n, np.nan)
+    vol_5 = np.full(n, np.nan)
+    vol_10 = np.full(n, np.nan)
+    volchg_1d = np.full(n, np.nan)
+    target = np.zeros(n, dtype=np.int64)
+
+    # running sums of finite closes + count of non-finite closes in each window
+    sum_5 = 0.0
+    sum_10 = 0.0
+    bad_5 = 0
+    bad_10 = 0
+    # Welford state (count, mean, sum of squared deviations) of the last 5 / 10
+    # finite returns + count of non-finite returns in each window
+    cnt_r5, mean_r5, m2_r5, bad_r5 = 0, 0.0, 0.0, 0
+    cnt_r10, mean_r10, m2_r10, bad_r10 = 0, 0.0, 0.0, 0
+
+    for i in range(n):
+        c = close[i]
+
+        # Moving averages (features)
+        if np.isfinite(c):
+            sum_5 += c
+            sum_10 += c
+        else:
+            bad_5 += 1
+            bad_10 += 1
+        if i >= 5:
+            old = close[i - 5]
+            if np.isfinite(old):
+                sum_5 -= old
+            else:
+                bad_5 -= 1
+        if i >= 10:
+            old = close[i - 10]
+            if np.isfinite(old):
+                sum_10 -= old
+            else:
+                bad_10 -= 1
+        if i >= 4 and bad_5 == 0:
+            ma_5[i] = sum_5 / 5.0
+        if i >= 9 and bad_10 == 0:
+            ma_10[i] = sum_10 / 10.0
+
+        # TARGET: tomorrow up? (last row has no tomorrow -> 0, as with shift(-1))
+        if i + 1 < n and close[i + 1] > c:
+            target[i] = 1
+
+        if i == 0:
+            continue
+
+        # Basic returns + volume change
+        r = c / close[i - 1] - 1.0
+        ret_1d[i] = r
+        volchg_1d[i] = volume[i] / volume[i - 1] - 1.0
+
+        # Volatility (std of returns); returns start at i == 1
+        if np.isfinite(r):
+            cnt_r5, mean_r5, m2_r5 = _welford_add(r, cnt_r5, mean_r5, m2_r5)
+            cnt_r10, mean_r10, m2_r10 = _welford_add(r, cnt_r10, mean_r10, m2_r10)
+        else:
+            bad_r5 += 1
+            bad_r10 += 1
+        if i >= 6:
+            old = ret_1d[i - 5]
+            if np.isfinite(old):
+                cnt_r5, mean_r5, m2_r5 = _welford_remove(old, cnt_r5, mean_r5, m2_r5)
+            else:
+                bad_r5 -= 1
+        if i >= 11:
+            old = ret_1d[i - 10]
+            if np.isfinite(old):
+                cnt_r10, mean_r10, m2_r10 = _welford_remove(old, cnt_r10, mean_r10, m2_r10)
+            else:
+                bad_r10 -= 1
+        if i >= 5 and bad_r5 == 0:
+            vol_5[i] = np.sqrt(max(m2_r5, 0.0) / 4.0)
+        if i >= 10 and bad_r10 == 0:
+            vol_10[i] = np.sqrt(max(m2_r10, 0.0) / 9.0)
+
+    return ret_1d, ma_5, ma_10, vol_5, vol_10, volchg_1d, target
 
-    # Volume change
-    out["volchg_1d"] = out["volume"].pct_change()
 
-    # TARGET: tomorrow up? (shift(-1) means "next day")
-    out["target_up_tomorrow"] = (out["close"].shift(-1) > out["close"]).astype(int)
+def build_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Create ML-friendly features from OHLCV.
+    Also create the target label: up tomorrow (1) / not up (0)
+    """
+    close = df["close"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
+
+    ret_1d, ma_5, ma_10, vol_5, vol_10, volchg_1d, target = _features(close, volume)
+
+    # Build the output directly instead of copying df and adding columns
+    out = pd.DataFrame({
+        "day": df["day"].to_numpy(),
+        "close": close,
+        "volume": volume,
+        "ret_1d": ret_1d,
+        "ma_5": ma_5,
+        "ma_10": ma_10,
+        # Price vs MA (normalized features)
+        "close_over_ma5": close / ma_5 - 1.0,
+        "close_over_ma10": close / ma_10 - 1.0,
+        "vol_5": vol_5,
+        "vol_10": vol_10,
+        "volchg_1d": volchg_1d,
+        "target_up_tomorrow": target,
+    })
 
     # Drop rows where rolling windows aren't ready / target missing
     out = out.dropna().reset_index(drop=True)
@@ -72,17 +212,21 @@ def train_timeseries_model(df_feat: pd.DataFrame, feature_cols: list[str]) -> di
     """
     Train a simple model (Logistic Regression) with time-series splits.
     """
-    X = df_feat[feature_cols].values
-    y = df_feat["target_up_tomorrow"].values
+    # float32 halves memory traffic through the scaler/solver; sklearn keeps it end to end
+    X = df_feat[feature_cols].to_numpy(dtype=np.float32)
+    y = df_feat["target_up_tomorrow"].to_numpy(dtype=np.int8)
 
     # TimeSeriesSplit respects time ordering (no future leakage)
     tss = TimeSeriesSplit(n_splits=5)
 
+    # warm_start: each fold (and the final fit) starts from the previous
+    # fold's coefficients, since the training prefix only grows
     pipeline = Pipeline([
         ("scaler", StandardScaler()),
-        ("clf", LogisticRegression(max_iter=2000))
+        ("clf", LogisticRegression(max_iter=2000, warm_start=True, solver="lbfgs"))
     ])
 
+    n_folds = tss.get_n_splits()
     fold_scores = []
     last_fold_report = None
     last_fold_cm = None
@@ -91,19 +235,25 @@ def train_timeseries_model(df_feat: pd.DataFrame, feature_cols: list[str]) -> di
         X_train, X_test = X[train_idx], X[test_idx]
         y_train, y_test = y[train_idx], y[test_idx]
 
+        # first fold starts cold; later folds only need a few more steps
+        if fold == 2:
+            pipeline.set_params(clf__max_iter=500)
+
         pipeline.fit(X_train, y_train)
         preds = pipeline.predict(X_test)
 
         acc = accuracy_score(y_test, preds)
         fold_scores.append(acc)
 
-        # keep last fold details (most recent time slice)
-        last_fold_report = classification_report(y_test, preds, digits=4)
-        last_fold_cm = confusion_matrix(y_test, preds).tolist()
+        # keep last fold details (most recent time slice); earlier folds would be discarded
+        if fold == n_folds:
+            last_fold_report = classification_report(y_test, preds, digits=4)
+            last_fold_cm = confusion_matrix(y_test, preds).tolist()
 
         print(f"Fold {fold} accuracy: {acc:.4f}")
 
-    # Fit on full dataset for final saved model
+    # Fit on full dataset for final saved model (full iteration budget, still warm)
+    pipeline.set_params(clf__max_iter=2000)
     pipeline.fit(X, y)
 
     return {
@@ -158,7 +308,8 @@ def main():
     model_path = f"ml/models/{args.symbol.upper()}_{ts}_logreg.joblib"
     meta_path = f"ml/models/{args.symbol.upper()}_{ts}_meta.json"
 
-    joblib.dump(result["model"], model_path)
+    # single compressed blob; joblib.load detects the compressor on its own
+    joblib.dump(result["model"], model_path, compress=MODEL_COMPRESS)
 
     meta = {
         "symbol": args.symbol.upper(),
@@ -2,6 +2,7 @@ package com.viklyst.platform.api
 
 import com.viklyst.platform.repo.BarDailyRepository
 import com.viklyst.platform.repo.InstrumentRepository
+import org.springframework.data.domain.PageRequest
 import org.springframework.web.bind.annotation.*
 import java.time.LocalDate
 
@@ -24,13 +25,22 @@ class BarsController(
     fun getDailyBars(
         @PathVariable symbol: String,
         @RequestParam from: LocalDate,
-        @RequestParam to: LocalDate
+        @RequestParam to: LocalDate,
+        // optional: only the last N bars of the range (still oldest -> newest)
+        @RequestParam(required = false) tail: Int?
     ): List<BarDailyResponse> {
         val sym = symbol.trim().uppercase()
         val instrument = instrumentRepo.findBySymbol(sym)
             .orElseThrow { NoSuchElementException("Instrument not found: $sym") }
 
-        return barRepo.findRange(instrument.id, from, to).map {
+        val bars = if (tail == null) {
+            barRepo.findRange(instrument.id, from, to)
+        } else {
+            require(tail > 0) { "tail must be positive: $tail" }
+            barRepo.findRangeLatest(instrument.id, from, to, PageRequest.of(0, tail)).asReversed()
+        }
+
+        return bars.map {
             BarDailyResponse(
                 day = it.id.day,
                 open = it.open,
@@ -2,6 +2,7 @@ package com.viklyst.platform.repo
 
 import com.viklyst.platform.domain.BarDaily
 import com.viklyst.platform.domain.BarDailyId
+import org.springframework.data.domain.Pageable
 import org.springframework.data.jpa.repository.JpaRepository
 import org.springframework.data.jpa.repository.Query
 import org.springframework.data.repository.query.Param
@@ -21,4 +22,19 @@ interface BarDailyRepository : JpaRepository<BarDaily, BarDailyId> {
         @Param("from") from: LocalDate,
         @Param("to") to: LocalDate
     ): List<BarDaily>
+
+    // newest first; pair with PageRequest.of(0, n) to get the last n bars in range
+    @Query("""
+        select b from BarDaily b
+        where b.id.instrumentId = :instrumentId
+          and b.id.day >= :from
+          and b.id.day <= :to
+        order by b.id.day desc
+    """)
+    fun findRangeLatest(
+        @Param("instrumentId") instrumentId: Long,
+        @Param("from") from: LocalDate,
+        @Param("to") to: LocalDate,
+        pageable: Pageable
+    ): List<BarDaily>
 }